@@ -1,17 +1,50 @@
+import asyncio
+import hashlib
+import itertools
 import logging
 import os
-
-# import itertools
-# from concurrent.futures import ThreadPoolExecutor
-# import json
-import threading
-import time
+import queue
 from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from urllib.parse import quote, urlencode
 
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest
+import pyarrow as pa
+import pyarrow.parquet as pq
 from alpaca.data.timeframe import TimeFrame
 
+from stock_trading_bot.data_fetching.async_data_fetch import BaseAsyncRESTClient
+
+DATA_BASE_URL = "https://data.alpaca.markets/v2/stocks"
+LANDING_DIRECTORY = "./data/landing"
+RFC3339_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Raw bar keys returned by /v2/stocks/bars with their Arrow types; the timestamp arrives as an RFC 3339 string
+RAW_BAR_SCHEMA = pa.schema(
+    [
+        ("t", pa.string()),
+        ("o", pa.float64()),
+        ("h", pa.float64()),
+        ("l", pa.float64()),
+        ("c", pa.float64()),
+        ("v", pa.float64()),
+        ("n", pa.float64()),
+        ("vw", pa.float64()),
+    ]
+)
+# Column names alpaca-py uses in BarSet.df, in the same order as RAW_BAR_SCHEMA
+BAR_COLUMNS = [
+    "timestamp",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "trade_count",
+    "vwap",
+]
+BAR_TIMESTAMP_TYPE = pa.timestamp("us", tz="UTC")
+
 # def test_alpaca_api_with_dynamic_time_range(symbol="NVDA", timeframe=TimeFrame.Day, duration=60, days_back=1, increment_by_days=2):
 
 
@@ -111,69 +144,334 @@ from alpaca.data.timeframe import TimeFrame
 #     api_thread.join()  # Wait for the thread to finish if necessary
 
 
-def call_api(client, request_params, stop_event):
-    calls = 0
-
-    while not stop_event.is_set():
-        try:
-            response = client.get_stock_bars(request_params)
-            calls += 1
-            json_file_path = f"./data/landing/response_{calls}.json"
-            parquet_file_path = f"./data/landing/response_{calls}.parquet"
-            data_df = response.df.reset_index(drop=False)
-            # Save data to parquet file
-            data_df.to_parquet(parquet_file_path)
-
-            # Save data to json file
-            # data_dict = data_df.to_dict(orient='records')
-            # with open(json_file_path, 'w') as f:
-            #     json.dump(list(data_dict), f, default=str)
-
-            logging.info(f"API call {calls} successful, data saved to {json_file_path}")
-        except Exception as e:
-            logging.error(f"Error on request {calls}: {str(e)}")
-            break
-
-    logging.info(f"Total API calls made: {calls}")
+def bars_path(params) -> str:
+    """Encode the bars endpoint path with its query string, so it can be built once and reused."""
+    return f"bars?{urlencode(params)}"
+
+
+async def fetch_bars(client, path):
+    """
+    Fetch every page of bars for a pre-encoded bars path.
+
+    Args:
+        client (BaseAsyncRESTClient): An open client pointed at the stock data API.
+        path (str): The bars path and query string, as built by bars_path.
+
+    Returns:
+        dict: Raw bar dicts keyed by symbol.
+    """
+    bars = {}
+    page_path = path
+    while True:
+        data = await client._request("GET", page_path)
+        for symbol, symbol_bars in (data.get("bars") or {}).items():
+            bars.setdefault(symbol, []).extend(symbol_bars)
+        page_token = data.get("next_page_token")
+        if not page_token:
+            return bars
+        page_path = f"{path}&page_token={quote(page_token, safe='')}"
+
+
+def bars_to_table(bars) -> pa.Table:
+    """Convert raw bars keyed by symbol straight into one Arrow table with a symbol column."""
+    tables = []
+    for symbol, symbol_bars in bars.items():
+        table = pa.Table.from_pylist(symbol_bars, schema=RAW_BAR_SCHEMA)
+        table = table.rename_columns(BAR_COLUMNS)
+        table = table.set_column(
+            0, "timestamp", table["timestamp"].cast(BAR_TIMESTAMP_TYPE)
+        )
+        table = table.add_column(
+            0, "symbol", pa.array([symbol] * table.num_rows, pa.string())
+        )
+        tables.append(table)
+
+    if not tables:
+        return pa.Table.from_pylist(
+            [],
+            schema=pa.schema(
+                [("symbol", pa.string()), ("timestamp", BAR_TIMESTAMP_TYPE)]
+                + [(name, pa.float64()) for name in BAR_COLUMNS[1:]]
+            ),
+        )
+    return pa.concat_tables(tables)
+
+
+def split_time_range(start, end, window):
+    """
+    Split the range from start to end into consecutive sub-windows no longer than window.
+
+    The bars endpoint treats both bounds as inclusive, so each sub-window stops one second
+    before the next one begins to avoid fetching a boundary bar twice.
+
+    Returns:
+        list[tuple[datetime, datetime]]: The (start, end) pair of every sub-window.
+    """
+    windows = []
+    while start < end:
+        window_end = start + window
+        if window_end >= end:
+            windows.append((start, end))
+        else:
+            windows.append((start, window_end - timedelta(seconds=1)))
+        start = window_end
+    return windows
+
+
+async def fetch_bars_in_windows(client, paths):
+    """
+    Fetch bars for several pre-encoded bars paths concurrently and merge them per symbol.
+
+    Args:
+        client (BaseAsyncRESTClient): An open client pointed at the stock data API.
+        paths (list[str]): Bars paths for consecutive time windows, in time order.
+
+    Returns:
+        dict: Raw bar dicts keyed by symbol, in time order.
+    """
+    if len(paths) == 1:
+        return await fetch_bars(client, paths[0])
+
+    # A TaskGroup cancels the sibling windows as soon as one fails, so they stop retrying
+    try:
+        async with asyncio.TaskGroup() as task_group:
+            tasks = [task_group.create_task(fetch_bars(client, path)) for path in paths]
+    except ExceptionGroup as e:
+        # Callers log a single request failure, so surface the first window's error
+        raise e.exceptions[0] from None
+
+    # tasks keep the input order, so extending window by window keeps bars sorted
+    bars = {}
+    for part in (task.result() for task in tasks):
+        for symbol, symbol_bars in part.items():
+            bars.setdefault(symbol, []).extend(symbol_bars)
+    return bars
+
+
+def bars_cache_path(cache_dir, params) -> Path:
+    """
+    Map a bars request to a cache file that stays the same across runs.
+
+    Everything except the end bound is hashed; the end bound only contributes its day, so
+    every run on the same day shares one file.
+
+    Returns:
+        Path: cache_dir/<sha256 of the request without its end>_<end day>.parquet
+    """
+    request_key = bars_path(
+        {name: value for name, value in params.items() if name != "end"}
+    )
+    digest = hashlib.sha256(request_key.encode()).hexdigest()
+    return Path(cache_dir) / f"{digest}_{params['end'][:10]}.parquet"
+
+
+def write_bars_cache(table, cache_path):
+    """Atomically write a cache entry and drop older entries for the same request."""
+    temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    pq.write_table(table, temp_path, compression="snappy")
+    os.replace(temp_path, cache_path)
+
+    # Entries for earlier end days of the same request are superseded by this one
+    digest = cache_path.name.rsplit("_", 1)[0]
+    for stale_path in cache_path.parent.glob(f"{digest}_*.parquet"):
+        if stale_path != cache_path:
+            stale_path.unlink(missing_ok=True)
+
+
+async def fetch_bars_table(
+    client, path, cache_path=None, cache_lock=None, window_paths=None
+) -> pa.Table:
+    """
+    Fetch bars as an Arrow table, serving repeated identical requests from an on-disk cache.
+
+    Args:
+        client (BaseAsyncRESTClient): An open client pointed at the stock data API.
+        path (str): The bars path for the full time range.
+        cache_path (Path | None): Cache file for this request, as built by bars_cache_path;
+            None disables caching.
+        cache_lock (asyncio.Lock | None): Lock shared by every worker using cache_path, so a
+            missing entry is fetched only once.
+        window_paths (list[str] | None): Optional bars paths for sub-windows of the full
+            range, fetched concurrently instead of path.
+
+    Returns:
+        pa.Table: The bars for every requested symbol.
+    """
+    paths = window_paths or [path]
+    if cache_path is None:
+        return bars_to_table(await fetch_bars_in_windows(client, paths))
+
+    # Workers that miss together wait here while the first one fills the cache
+    async with cache_lock:
+        if not cache_path.exists():
+            table = bars_to_table(await fetch_bars_in_windows(client, paths))
+            await asyncio.to_thread(write_bars_cache, table, cache_path)
+            return table
+
+    return await asyncio.to_thread(pq.read_table, cache_path)
+
+
+def save_landing_dataset(tables):
+    """Append buffered responses, tagged with their call_id, to the landing dataset partitioned by symbol."""
+    pq.write_to_dataset(
+        pa.concat_tables(tables),
+        root_path=LANDING_DIRECTORY,
+        partition_cols=["symbol"],
+        compression="snappy",
+    )
 
 
-def test_alpaca_api_with_longest_time_range(
-    symbol="NVDA", timeframe=TimeFrame.Day, duration=60
+async def call_api(
+    client,
+    path,
+    call_ids,
+    cache_path=None,
+    cache_lock=None,
+    window_paths=None,
+    flush_every=10,
+    worker_id=0,
 ):
-    api_key = os.getenv("APCA_API_KEY_ID")
-    secret_key = os.getenv("APCA_API_SECRET_KEY")
-    client = StockHistoricalDataClient(api_key, secret_key)
-    os.makedirs("./data/landing", exist_ok=True)
-    end_date = datetime.now() - timedelta(weeks=1)
-    start_date = datetime(2016, 1, 1)
-    request_params = StockBarsRequest(
-        symbol_or_symbols=[symbol], timeframe=timeframe, start=start_date, end=end_date
-    )
-
-    # Create a thread for calling the API
-    stop_event = threading.Event()
-    api_thread = threading.Thread(
-        target=call_api, args=(client, request_params, stop_event)
+    """Poll the bars endpoint until cancelled or a request fails."""
+    calls = 0
+    call_id = None
+    pending_tables = []
+
+    try:
+        while True:
+            try:
+                table = await fetch_bars_table(
+                    client, path, cache_path, cache_lock, window_paths
+                )
+                call_id = next(call_ids)
+                calls += 1
+                # Every call lands the same history, so record which response each row came from
+                pending_tables.append(
+                    table.append_column(
+                        "call_id", pa.array([call_id] * table.num_rows, pa.int64())
+                    )
+                )
+                if len(pending_tables) >= flush_every:
+                    # Hand the buffer off first so a cancelled flush is not written twice
+                    flush_tables, pending_tables = pending_tables, []
+                    # Encode in a worker thread so the event loop keeps other requests in flight
+                    await asyncio.to_thread(save_landing_dataset, flush_tables)
+
+                # Save data to json file (orjson encodes the datetimes from to_pylist in C)
+                # import orjson
+                # json_file_path = f"./data/landing/response_{call_id}.json"
+                # with open(json_file_path, "wb") as f:
+                #     f.write(orjson.dumps(table.to_pylist()))
+
+                logging.info(
+                    f"API call {call_id} successful, {table.num_rows} bars buffered"
+                )
+            except Exception as e:
+                logging.error(
+                    f"Worker {worker_id} request failed after {calls} calls "
+                    f"(last API call {call_id}): {str(e)}"
+                )
+                break
+    finally:
+        if pending_tables:
+            await asyncio.to_thread(save_landing_dataset, pending_tables)
+
+
+async def test_alpaca_api_with_longest_time_range(
+    symbols=("NVDA",),
+    timeframe=TimeFrame.Day,
+    duration=60,
+    workers=8,
+    cache_dir=None,
+    window=timedelta(days=365),
+):
+    os.makedirs(LANDING_DIRECTORY, exist_ok=True)
+    if cache_dir is not None:
+        # The window ends in the past, so repeated identical requests can be served from disk
+        os.makedirs(cache_dir, exist_ok=True)
+    # End on a day boundary so the request, and its cache entry, stay the same all day
+    end_date = (datetime.now() - timedelta(weeks=1)).replace(
+        hour=0, minute=0, second=0, microsecond=0
     )
-    api_thread.start()
-
-    # Allow the thread to run for the specified duration
-    time.sleep(duration)
-    stop_event.set()  # Signal the thread to stop making API calls
-    api_thread.join()  # Wait for the thread to finish
+    start_date = datetime(2016, 1, 1)
+    params = {
+        # The bars endpoint takes a comma-separated list, so one request covers every symbol
+        "symbols": ",".join(symbols),
+        "timeframe": timeframe.value,
+        "start": start_date.strftime(RFC3339_FORMAT),
+        "end": end_date.strftime(RFC3339_FORMAT),
+        "limit": 10000,
+    }
+    # Encode the request paths once; every call in the polling loop reuses them
+    path = bars_path(params)
+    cache_path = bars_cache_path(cache_dir, params) if cache_dir is not None else None
+    window_paths = None
+    if window:
+        # Fetch the multi-year range as concurrent sub-window requests instead of serial pages
+        window_paths = [
+            bars_path(
+                {
+                    **params,
+                    "start": window_start.strftime(RFC3339_FORMAT),
+                    "end": window_end.strftime(RFC3339_FORMAT),
+                }
+            )
+            for window_start, window_end in split_time_range(
+                start_date, end_date, window
+            )
+        ]
+
+    call_ids = itertools.count(1)
+    cache_lock = asyncio.Lock()
+    async with BaseAsyncRESTClient(DATA_BASE_URL) as client:
+        try:
+            # Cancel the workers once the duration has elapsed
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(
+                        call_api(
+                            client,
+                            path,
+                            call_ids,
+                            cache_path,
+                            cache_lock,
+                            window_paths,
+                            worker_id=worker_id,
+                        )
+                        for worker_id in range(workers)
+                    )
+                ),
+                timeout=duration,
+            )
+        except TimeoutError:
+            pass
+
+    # call_ids hands out sequential ids, so the next unused id is one past the total
+    logging.info(f"Total API calls made: {next(call_ids) - 1}")
 
 
 def main():
     os.makedirs("./logs", exist_ok=True)
     # Setup logging to file with timestamp in filename
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        filename=f'./logs/alpaca_api_test_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log',
-        filemode="a",
+    file_handler = logging.FileHandler(
+        f'./logs/alpaca_api_test_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log',
+        mode="a",
     )  # Append mode
-
-    test_alpaca_api_with_longest_time_range()
+    file_handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    )
+    # The event loop only enqueues records; a background thread does the file I/O
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    # QueueHandler bakes its formatted text into the record; leave the real formatting to file_handler
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+    listener = QueueListener(log_queue, file_handler)
+    listener.start()
+
+    try:
+        asyncio.run(test_alpaca_api_with_longest_time_range())
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
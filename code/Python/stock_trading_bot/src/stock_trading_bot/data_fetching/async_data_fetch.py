@@ -1,25 +1,88 @@
 import asyncio
 import base64
+import math
 import os
+import random
 import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 
 import aiohttp
 
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional; fall back to the stdlib decoder
+    from json import loads as json_loads
+
 __version__ = "0.22.0"
 
 
 class BaseAsyncRESTClient:
     def __init__(
-        self, base_url, api_key=None, retry_attempts=3, retry_wait=1, retry_codes=None
+        self,
+        base_url,
+        api_key=None,
+        retry_attempts=3,
+        retry_wait=1,
+        retry_codes=None,
+        retry_wait_cap=60,
     ):
         self.base_url = base_url
         self._api_key = os.getenv("APCA_API_KEY_ID")
         self._secret_key = os.getenv("APCA_API_SECRET_KEY")
         self.retry_attempts = retry_attempts
         self.retry_wait = retry_wait
+        self.retry_wait_cap = retry_wait_cap
         self.retry_codes = retry_codes if retry_codes is not None else [429, 504]
+        # Built on the first request, after any subclass __init__ has run, and cleared
+        # whenever the auth settings below change
+        self._default_headers = None
         self._oauth_token = None
         self._use_basic_auth = False
+        # Persistent keep-alive session, opened in __aenter__
+        self._session = None
+
+    async def __aenter__(self):
+        """
+        Open a single ClientSession whose pooled connections are reused by every request,
+        so only the first call to a host pays the TCP + TLS handshake.
+        """
+        connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=32,
+            keepalive_timeout=75,
+            # Keep resolved addresses for 5 minutes instead of aiohttp's 10 seconds
+            use_dns_cache=True,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """
+        Close the session and release its pooled connections.
+        """
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def _oauth_token(self):
+        return self._oauth_token_value
+
+    @_oauth_token.setter
+    def _oauth_token(self, token):
+        self._oauth_token_value = token
+        self._default_headers = None
+
+    @property
+    def _use_basic_auth(self):
+        return self._use_basic_auth_value
+
+    @_use_basic_auth.setter
+    def _use_basic_auth(self, use_basic_auth):
+        self._use_basic_auth_value = use_basic_auth
+        self._default_headers = None
 
     def _get_default_headers(self) -> dict:
         """
@@ -60,30 +123,104 @@ class BaseAsyncRESTClient:
 
         return headers
 
+    def _next_backoff(self, previous_wait) -> float:
+        """
+        Pick the next retry delay using "decorrelated jitter" backoff.
+
+        The delay is drawn from [retry_wait, 3 * previous_wait] and capped at retry_wait_cap,
+        so concurrent requests that fail together do not all retry on the same tick.
+
+        Args:
+            previous_wait (float): The delay used before the previous attempt.
+
+        Returns:
+            float: Seconds to wait before the next attempt.
+        """
+        return min(
+            self.retry_wait_cap, random.uniform(self.retry_wait, previous_wait * 3)
+        )
+
+    def _retry_after_seconds(self, headers) -> float | None:
+        """
+        Read the server's Retry-After hint, given either as delay-seconds or an HTTP-date.
+
+        The hint is capped at retry_wait_cap, like the jittered backoff, so a huge value or a
+        far-future date cannot stall a worker indefinitely.
+
+        Args:
+            headers: The response headers, or None.
+
+        Returns:
+            float | None: Seconds to wait, or None if the header is missing or malformed.
+        """
+        retry_after = headers.get("Retry-After") if headers else None
+        if not retry_after:
+            return None
+        try:
+            seconds = float(retry_after)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                return None
+            if retry_at.tzinfo is None:
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        if not math.isfinite(seconds):
+            return None
+        return min(self.retry_wait_cap, max(0.0, seconds))
+
     async def _request(self, method, path, data=None):
         url = f"{self.base_url}/{path}"
-        headers = self._get_default_headers()
+        if self._default_headers is None:
+            self._default_headers = self._get_default_headers()
+        headers = self._default_headers
         params = data if method == "GET" else None
         json = data if method != "GET" else None
 
-        async with aiohttp.ClientSession() as session:
-            for attempt in range(self.retry_attempts + 1):
-                try:
-                    async with session.request(
-                        method, url, headers=headers, params=params, json=json
-                    ) as response:
-                        response.raise_for_status()
-                        return await response.json()
-                except aiohttp.ClientResponseError as e:
-                    if e.status in self.retry_codes and attempt < self.retry_attempts:
-                        await asyncio.sleep(self.retry_wait * (2**attempt))
-                    else:
-                        raise
-                except aiohttp.ClientError:
-                    if attempt < self.retry_attempts:
-                        await asyncio.sleep(self.retry_wait * (2**attempt))
+        if self._session is None:
+            raise RuntimeError(
+                "BaseAsyncRESTClient must be used as an async context manager"
+            )
+
+        wait = self.retry_wait
+        for attempt in range(self.retry_attempts + 1):
+            try:
+                async with self._session.request(
+                    method, url, headers=headers, params=params, json=json
+                ) as response:
+                    response.raise_for_status()
+                    # Keep response.json()'s mimetype check, but hand the decoder raw bytes so
+                    # aiohttp does not first decode the whole body into a str
+                    content_type = response.content_type
+                    if content_type != "application/json" and not content_type.endswith(
+                        "+json"
+                    ):
+                        raise aiohttp.ContentTypeError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                            message=f"Attempt to decode JSON with unexpected mimetype: {content_type}",
+                            headers=response.headers,
+                        )
+                    return json_loads(await response.read())
+            except aiohttp.ClientResponseError as e:
+                if e.status in self.retry_codes and attempt < self.retry_attempts:
+                    # Prefer the server's own wait hint; it avoids both oversleeping and re-bans
+                    retry_after = self._retry_after_seconds(e.headers)
+                    if retry_after is not None:
+                        await asyncio.sleep(retry_after)
                     else:
-                        raise
+                        wait = self._next_backoff(wait)
+                        await asyncio.sleep(wait)
+                else:
+                    raise
+            except aiohttp.ClientError:
+                if attempt < self.retry_attempts:
+                    wait = self._next_backoff(wait)
+                    await asyncio.sleep(wait)
+                else:
+                    raise
 
 
 # Usage in an async function
@@ -98,15 +235,25 @@ async def fetch_data(client):
         print(f"Failed to fetch data: {e}")
 
 
-async def main():
-    client = BaseAsyncRESTClient("https://data.alpaca.markets/v2/stocks")
-    start_time = time.time()
-    duration = 60  # Run for one minute
+async def fetch_worker(client, deadline):
+    """Keep one request in flight until the deadline; return how many were made."""
     calls = 0
-
-    while time.time() - start_time < duration:
+    while time.perf_counter() < deadline:
         await fetch_data(client)
         calls += 1
+    return calls
+
+
+async def main(concurrency=32):
+    duration = 60  # Run for one minute
+    deadline = time.perf_counter() + duration
+
+    async with BaseAsyncRESTClient("https://data.alpaca.markets/v2/stocks") as client:
+        # Overlap round-trips: each worker keeps one request outstanding on the shared pool
+        worker_calls = await asyncio.gather(
+            *(fetch_worker(client, deadline) for _ in range(concurrency))
+        )
+    calls = sum(worker_calls)
 
     print(f"Total API calls made in one minute: {calls}")
 
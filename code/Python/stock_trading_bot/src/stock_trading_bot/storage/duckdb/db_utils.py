@@ -20,7 +20,7 @@ vwap DOUBLE,
 
 
 def prepare_and_connect_to_latest_snapshot(
-    db_directory: Path, snapshot_directory: Path
+    db_directory: Path, snapshot_directory: Path, settings: dict | None = None
 ) -> duckdb.DuckDBPyConnection:
     """
     Prepare the working environment by selecting and connecting to the latest snapshot.
@@ -28,6 +28,8 @@ def prepare_and_connect_to_latest_snapshot(
     Args:
         db_directory (Path): The directory where the database is stored.
         snapshot_directory (Path): The directory where snapshots are stored.
+        settings (dict | None): Optional DuckDB settings applied to the connection,
+            e.g. {"preserve_insertion_order": False, "memory_limit": "4GB"}.
 
     Returns:
         duckdb.DuckDBPyConnection: The connection to the DuckDB database.
@@ -50,7 +52,9 @@ def prepare_and_connect_to_latest_snapshot(
         logger.warning("No snapshot found, initializing a new database.")
 
     logger.trace(f"Connecting to {working_db_path}")
-    return duckdb.connect(str(working_db_path))
+    if settings:
+        logger.debug(f"Applying DuckDB settings: {settings}")
+    return duckdb.connect(str(working_db_path), config=settings or {})
 
 
 def get_latest_snapshot(snapshot_directory) -> Path | None:
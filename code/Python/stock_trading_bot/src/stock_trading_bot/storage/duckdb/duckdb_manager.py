@@ -26,6 +26,8 @@ class DuckDBManager(StorageManager):
             "max_snapshots", 7
         )  # Default to 7 days of snapshots
         self.snapshot_directory = self.db_directory / "snapshots"
+        # Optional DuckDB session settings, e.g. preserve_insertion_order / memory_limit / threads
+        self.duckdb_settings = config.get("duckdb_settings", {})
 
         self.snapshot_directory.mkdir(parents=True, exist_ok=True)
 
@@ -38,7 +40,7 @@ class DuckDBManager(StorageManager):
         If no snapshot is available, create a new connection to the database.
         """
         self.connection = db_utils.prepare_and_connect_to_latest_snapshot(
-            self.db_directory, self.snapshot_directory
+            self.db_directory, self.snapshot_directory, self.duckdb_settings
         )
         return self
 
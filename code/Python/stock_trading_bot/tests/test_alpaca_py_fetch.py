@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pyarrow as pa
+import pytest
+
+from stock_trading_bot.data_fetching.alpaca_py_fetch import (
+    bars_to_table,
+    fetch_bars_in_windows,
+    split_time_range,
+)
+
+START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def test_split_time_range_single_window():
+    end = START + timedelta(days=10)
+    assert split_time_range(START, end, timedelta(days=365)) == [(START, end)]
+
+
+def test_split_time_range_inclusive_bounds_do_not_overlap():
+    end = START + timedelta(days=25)
+    windows = split_time_range(START, end, timedelta(days=10))
+
+    assert windows == [
+        (START, START + timedelta(days=10) - timedelta(seconds=1)),
+        (START + timedelta(days=10), START + timedelta(days=20) - timedelta(seconds=1)),
+        (START + timedelta(days=20), end),
+    ]
+    for (_, previous_end), (next_start, _) in zip(windows, windows[1:]):
+        assert next_start - previous_end == timedelta(seconds=1)
+
+
+def test_split_time_range_exact_multiple_keeps_real_end():
+    end = START + timedelta(days=20)
+    windows = split_time_range(START, end, timedelta(days=10))
+
+    assert len(windows) == 2
+    assert windows[-1] == (START + timedelta(days=10), end)
+
+
+@pytest.mark.parametrize("end", [START, START - timedelta(days=1)])
+def test_split_time_range_empty(end):
+    assert split_time_range(START, end, timedelta(days=10)) == []
+
+
+def test_bars_to_table_empty_response_schema():
+    table = bars_to_table({})
+
+    assert table.num_rows == 0
+    assert table.schema == pa.schema(
+        [
+            ("symbol", pa.string()),
+            ("timestamp", pa.timestamp("us", tz="UTC")),
+            ("open", pa.float64()),
+            ("high", pa.float64()),
+            ("low", pa.float64()),
+            ("close", pa.float64()),
+            ("volume", pa.float64()),
+            ("trade_count", pa.float64()),
+            ("vwap", pa.float64()),
+        ]
+    )
+
+
+def test_bars_to_table_matches_empty_schema():
+    bars = {
+        "NVDA": [
+            {
+                "t": "2020-01-02T05:00:00Z",
+                "o": 1,
+                "h": 2,
+                "l": 0.5,
+                "c": 1.5,
+                "v": 100,
+                "n": 10,
+                "vw": 1.2,
+            },
+        ]
+    }
+    table = bars_to_table(bars)
+
+    assert table.schema == bars_to_table({}).schema
+    assert table["symbol"].to_pylist() == ["NVDA"]
+    assert table["timestamp"].to_pylist() == [
+        datetime(2020, 1, 2, 5, tzinfo=timezone.utc)
+    ]
+
+
+class WindowClient:
+    """Fails the "bad" window at once and holds every other window open."""
+
+    def __init__(self):
+        self.cancelled = []
+
+    async def _request(self, method, path):
+        if path == "bad":
+            raise RuntimeError("window failed")
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled.append(path)
+            raise
+        return {"bars": {}}
+
+
+def test_fetch_bars_in_windows_cancels_siblings_on_failure():
+    client = WindowClient()
+
+    async def fetch():
+        with pytest.raises(RuntimeError, match="window failed"):
+            await fetch_bars_in_windows(client, ["a", "bad", "b"])
+        # Checked before asyncio.run tears the loop down and cancels any stragglers
+        return sorted(client.cancelled)
+
+    assert asyncio.run(fetch()) == ["a", "b"]
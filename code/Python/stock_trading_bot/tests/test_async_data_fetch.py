@@ -0,0 +1,180 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import AsyncMock
+
+import aiohttp
+import pytest
+
+from stock_trading_bot.data_fetching.async_data_fetch import BaseAsyncRESTClient
+
+
+@pytest.fixture
+def client():
+    return BaseAsyncRESTClient(
+        "https://example.invalid", retry_wait=1, retry_wait_cap=5
+    )
+
+
+def test_next_backoff_stays_between_retry_wait_and_cap(client):
+    for previous_wait in (1, 2, 4, 100):
+        for _ in range(200):
+            assert 1 <= client._next_backoff(previous_wait) <= 5
+
+
+def test_next_backoff_grows_at_most_threefold(client):
+    for _ in range(200):
+        assert client._next_backoff(1) <= 3
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        (None, None),
+        ({}, None),
+        ({"Retry-After": ""}, None),
+        ({"Retry-After": "not a date"}, None),
+        ({"Retry-After": "inf"}, None),
+        ({"Retry-After": "nan"}, None),
+        ({"Retry-After": "2"}, 2.0),
+        ({"Retry-After": "-3"}, 0.0),
+        ({"Retry-After": "99999"}, 5.0),
+    ],
+)
+def test_retry_after_seconds(client, headers, expected):
+    assert client._retry_after_seconds(headers) == expected
+
+
+def test_retry_after_http_date(client):
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=3)
+    seconds = client._retry_after_seconds(
+        {"Retry-After": format_datetime(retry_at, usegmt=True)}
+    )
+    # HTTP-dates have whole-second resolution
+    assert 1 <= seconds <= 3
+
+
+def test_retry_after_http_date_is_capped(client):
+    retry_at = datetime.now(timezone.utc) + timedelta(days=365)
+    assert (
+        client._retry_after_seconds(
+            {"Retry-After": format_datetime(retry_at, usegmt=True)}
+        )
+        == 5
+    )
+
+
+def test_retry_after_http_date_in_the_past(client):
+    assert (
+        client._retry_after_seconds({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        == 0
+    )
+
+
+class StubResponse:
+    def __init__(self, body, content_type="application/json"):
+        self.body = body
+        self.content_type = content_type
+        self.status = 200
+        self.headers = {"Content-Type": content_type}
+        self.request_info = None
+        self.history = ()
+
+    def raise_for_status(self):
+        pass
+
+    async def read(self):
+        return self.body
+
+
+class StubSession:
+    """Plays back queued responses, raising any queued exception instead."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.headers = []
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        self.headers.append(kwargs["headers"])
+        outcome = self.outcomes.pop(0)
+
+        class RequestContext:
+            async def __aenter__(self):
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+        return RequestContext()
+
+
+def rate_limited(headers=None):
+    return aiohttp.ClientResponseError(
+        request_info=None, history=(), status=429, headers=headers
+    )
+
+
+def run_request(client, session, monkeypatch):
+    sleep = AsyncMock()
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    client._session = session
+    return asyncio.run(client._request("GET", "bars")), sleep
+
+
+def test_request_sleeps_for_retry_after(client, monkeypatch):
+    session = StubSession(
+        rate_limited({"Retry-After": "2"}), StubResponse(b'{"bars": {}}')
+    )
+
+    data, sleep = run_request(client, session, monkeypatch)
+
+    assert data == {"bars": {}}
+    assert session.calls == 2
+    sleep.assert_awaited_once_with(2.0)
+
+
+def test_request_falls_back_to_backoff_without_retry_after(client, monkeypatch):
+    session = StubSession(rate_limited(), StubResponse(b"{}"))
+
+    data, sleep = run_request(client, session, monkeypatch)
+
+    assert data == {}
+    sleep.assert_awaited_once()
+    assert 1 <= sleep.await_args.args[0] <= 5
+
+
+def test_request_headers_follow_token_rotation(client, monkeypatch):
+    session = StubSession(StubResponse(b"{}"), StubResponse(b"{}"))
+    run_request(client, session, monkeypatch)
+
+    client._oauth_token = "rotated"
+    run_request(client, session, monkeypatch)
+
+    assert "Authorization" not in session.headers[0]
+    assert session.headers[1]["Authorization"] == "Bearer rotated"
+
+
+def test_request_headers_use_subclass_state(monkeypatch):
+    class TokenClient(BaseAsyncRESTClient):
+        def __init__(self, base_url, token):
+            super().__init__(base_url)
+            self.token = token
+
+        def _get_auth_headers(self):
+            return {"Authorization": "Token " + self.token}
+
+    session = StubSession(StubResponse(b"{}"))
+    run_request(TokenClient("https://example.invalid", "abc"), session, monkeypatch)
+
+    assert session.headers[0]["Authorization"] == "Token abc"
+
+
+def test_request_rejects_non_json_body(client, monkeypatch):
+    session = StubSession(StubResponse(b"<html></html>", content_type="text/html"))
+
+    with pytest.raises(aiohttp.ContentTypeError):
+        run_request(client, session, monkeypatch)
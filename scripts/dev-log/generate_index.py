@@ -1,11 +1,12 @@
-import os
+from pathlib import Path
 
 
 def get_unique_highest_title(file_path):
     highest_level = 7  # More than the maximum markdown levels
     title = None
+    count = 0
 
-    with open(file_path, "r", encoding="utf-8") as file:
+    with open(file_path, "r", encoding="utf-8", buffering=65536) as file:
         for line in file:
             # Check if the line starts with a Markdown header
             if line.startswith("#"):
@@ -20,6 +21,9 @@ def get_unique_highest_title(file_path):
                 elif level == highest_level:
                     # Count occurrences of this level
                     count += 1
+                    # Nothing outranks a repeated level-1 header, so the result is settled
+                    if highest_level == 1:
+                        break
 
     # Only return the title if it's uniquely at the highest level
     if count == 1:
@@ -27,28 +31,26 @@ def get_unique_highest_title(file_path):
     return None
 
 
+def format_entry(log_file):
+    date = log_file.stem
+    entry = f"- [Development Log Entry - {date}]({log_file.name})"
+    unique_title = get_unique_highest_title(log_file)
+    # If a unique highest-level title is found, append it to the entry
+    if unique_title:
+        entry += f" - {unique_title}"
+    return entry + "\n"
+
+
 # Path to the dev-log directory
-dev_log_dir = "./doc/dev-log"
-index_file_path = os.path.join(dev_log_dir, "index.md")
+dev_log_dir = Path("./doc/dev-log")
+index_file_path = dev_log_dir / "index.md"
 
-# Fetch all markdown files
-log_files = [
-    f for f in os.listdir(dev_log_dir) if f.endswith(".md") and f != "index.md"
-]
-log_files.sort()
+# Fetch all dated markdown files (the index itself does not match the pattern)
+log_files = sorted(dev_log_dir.glob("[0-9]*.md"))
 
 # Create or overwrite the index file
 with open(index_file_path, "w") as index_file:
     index_file.write("# Development Log Index\n\n")
-    for log_file in log_files:
-        file_path = os.path.join(dev_log_dir, log_file)
-        date = log_file.split(".")[0]
-        title = f"Development Log Entry - {date}"
-        unique_title = get_unique_highest_title(file_path)
-        entry = f"- [{title}]({log_file})"
-        # If a unique highest-level title is found, append it to the entry
-        if unique_title:
-            entry += f" - {unique_title}"
-        index_file.write(entry + "\n")
+    index_file.writelines(format_entry(log_file) for log_file in log_files)
 
 print("Index file has been created successfully.")
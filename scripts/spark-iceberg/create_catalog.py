@@ -1,5 +1,4 @@
 from pyiceberg.catalog.rest import RestCatalog
-from requests import Session
 
 # Configuration properties
 properties = {
@@ -12,13 +11,8 @@ properties = {
 # Initialize the REST catalog
 catalog = RestCatalog(name="demo", **properties)
 
-# Create and configure a session
-session = Session()
-session.verify = False  # Turn off SSL verification
-
-# Use the session to interact with your services
-response = session.get("http://localhost:8181/namespaces")
-print(response.text)
+# List namespaces through the catalog's own REST session
+print(catalog.list_namespaces())
 
 from pyiceberg.schema import Schema
 from pyiceberg.types import StringType, TimestamptzType, ListType, NestedField